@@ -12,11 +12,20 @@ pwndbg + GDB
 
 
 import os
+import re
 import sys
 import json
+import time
+import fcntl
+import select
+import shutil
+import secrets
+import threading
+import asyncio
 import argparse
 import subprocess
 from pathlib import Path
+from types import MappingProxyType
 
 from mcp.server.fastmcp import FastMCP
 
@@ -27,8 +36,57 @@ mcp = FastMCP("pwndbg-mcp-server", log_level="ERROR")
 gdb_process = None
 is_connected = False
 
+# GDB stdin/stdout 접근 잠금 (도구 호출은 별도 스레드에서 동시에 실행될 수 있음)
+_gdb_lock = threading.Lock()
+
+# 시간 초과되어 아직 도착하지 않은 이전 요청의 마지막 마커 (도착하면 그 이전 출력은 버림)
+_stale_marker = None
+
+# 세션 시작/종료 잠금
+_session_lock = asyncio.Lock()
+
+# 명령어 전송 큐와 이를 처리하는 작업 (첫 제출 시 생성)
+_command_queue = None
+_writer_task = None
+
+# 한 번에 모아서 보낼 최대 입력 크기(바이트)와 요청을 기다리는 시간
+# (GDB가 출력을 쓰는 동안 입력 파이프(64 KiB)가 가득 차 서로 막히지 않도록 작게 유지)
+_BATCH_BYTES = 16 * 1024
+_BATCH_WINDOW = 0.001
+
+# 명령어 최대 길이
+_COMMAND_MAX = 200
+
+# context_bundle() 한 번에 실행할 수 있는 최대 명령어 수
+_BUNDLE_MAX = 32
+
+# GDB 실행 파일 경로 (첫 조회 성공 시 캐시)
+gdb_path = None
+
+# pwndbg 설치 확인 여부 (설치가 확인되면 캐시)
+pwndbg_found = False
+
+# 홈 디렉토리 (모듈 로드 시 한 번만 조회)
+_HOME = Path.home()
+
+# 세션 동안 결과가 바뀌지 않는 명령어의 결과 캐시 (세션 시작/종료, 상태 변경 시 초기화)
+_result_cache: dict[str, str] = {}
+
+# 캐시된 결과를 파싱한 구조화 결과 (_result_cache와 함께 초기화)
+_parsed_cache: dict[str, dict] = {}
+
+# 캐시 초기화 횟수 (응답을 기다리는 동안 캐시가 무효화되었는지 확인용)
+_result_cache_generation = 0
+
+# 결과를 캐시할 수 있는 명령어
+_IDEMPOTENT_COMMANDS = frozenset({'checksec', 'vmmap', 'got', 'plt', 'piebase'})
+
+# 프로세스 상태를 바꾸어 캐시를 무효화하는 명령어
+# (print는 레지스터/메모리 대입이나 mmap() 같은 inferior 함수 호출을 할 수 있음)
+_MUTATING_COMMANDS = frozenset({'run', 'continue', 'step', 'next', 'finish', 'set', 'break', 'file', 'load', 'print'})
+
 # 허용된 pwndbg 명령어 화이트리스트
-ALLOWED_COMMANDS = {
+ALLOWED_COMMANDS = frozenset({
     # 힙 관련
     'heap', 'bins', 'vis_heap_chunks', 'heap chunks', 'chunk', 
     'fastbins', 'smallbins', 'largebins', 'unsortedbin', 'tcache', 'arena',
@@ -51,101 +109,490 @@ ALLOWED_COMMANDS = {
     # 기본 GDB 명령어
     'info', 'print', 'x', 'examine', 'backtrace', 'bt', 'frame',
     'set', 'show', 'list', 'file', 'load'
-}
+})
+
+# 사용자 정의 명령어에서 차단할 위험한 패턴
+DANGEROUS_PATTERNS = [
+    'rm', 'del', 'format', 'mkfs', 'dd if=', 'dd of=',
+    'sudo', 'su', 'chmod +x', 'wget', 'curl', 'nc ', 'netcat',
+    'python -c', 'perl -e', 'ruby -e', 'bash -c', 'sh -c',
+    '$(', '`', '&&', '||', ';', '|', '>', '>>', '<'
+]
+
+# 위험한 패턴을 하나의 정규식으로 미리 컴파일 (명령어를 한 번만 훑음)
+_DANGEROUS_RE = re.compile("|".join(re.escape(p) for p in DANGEROUS_PATTERNS), re.IGNORECASE)
+
+# 오류 메시지용 정렬된 화이트리스트 (한 번만 계산)
+_ALLOWED_SORTED_STR = ", ".join(sorted(ALLOWED_COMMANDS))
+
+# 카테고리별 명령어 목록 (읽기 전용)
+COMMANDS_BY_CATEGORY = MappingProxyType({
+    "힙 분석": ("heap", "bins", "vis_heap_chunks", "chunk", "fastbins", "smallbins", "largebin", "unsortedbin", "tcache", "arena"),
+    "보안 분석": ("checksec", "vmmap", "canary", "piebase", "procinfo"),
+    "레지스터/메모리": ("registers", "regs", "stack", "telescope", "context", "hexdump"),
+    "검색/분석": ("search", "find", "got", "plt", "rop", "ropper", "strings"),
+    "디스어셈블리": ("disasm", "disassemble", "nearpc", "pdisass"),
+    "실행 제어": ("break", "continue", "step", "next", "finish", "run"),
+    "기본 GDB": ("info", "print", "x", "examine", "backtrace", "bt", "frame", "set", "show", "list", "file", "load")
+})
+
+# list_available_commands() 응답 (변하지 않으므로 모듈 로드 시 한 번만 생성)
+_AVAILABLE_COMMANDS_STR = "\n".join(
+    ["=== 사용 가능한 pwndbg 명령어 목록 ===", ""]
+    + [
+        line
+        for category, commands in COMMANDS_BY_CATEGORY.items()
+        for line in (f"📋 {category}:", *(f"  • {cmd}" for cmd in commands), "")
+    ]
+    + [
+        "⚠️ 참고: execute_custom_command() 툴을 사용하여 위 명령어들을 직접 실행할 수 있습니다.",
+        "하지만 각 기능별로 전용 툴을 사용하는 것을 권장합니다.",
+    ]
+)
 
-def _execute_safe_command(command: str) -> str:
-    """안전한 명령어 실행"""
-    global gdb_process, is_connected
+# 출력에 섞여 들어오는 pwndbg 프롬프트 (색상 코드 포함)
+_PROMPT_RE = re.compile(rb"^(?:\x1b\[[0-9;]*m|[\x01\x02])*pwndbg>(?:\x1b\[[0-9;]*m|[\x01\x02])*[ ]?", re.MULTILINE)
+
+# 빈 줄 (결과에서 제거)
+_BLANK_LINE_RE = re.compile(rb"^[ \t\r]*\n", re.MULTILINE)
+
+# ANSI 색상 코드 (파싱 전에 제거)
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+# vmmap 메모리 영역 라인: Start End Perm Size Offset File
+_VMMAP_RE = re.compile(
+    r"^[^\S\n]*(?:►[^\S\n]*)?(0x[0-9a-f]+)\s+(0x[0-9a-f]+)\s+([rwxps-]{4})\s+([0-9a-f]+)\s+([0-9a-f]+)[^\S\n]*(.*)$",
+    re.MULTILINE
+)
+
+# checksec 항목 라인: "RELRO:      Full RELRO"
+_CHECKSEC_RE = re.compile(r"^[^\S\n]*([A-Za-z][\w ]*?):[^\S\n]+(.+?)[^\S\n]*$", re.MULTILINE)
+
+# 레지스터 라인: "*RAX  0x555555555149 (main) ◂— endbr64" (*는 직전 실행에서 값이 바뀐 레지스터)
+_REGISTER_RE = re.compile(r"^[^\S\n]*(\*)?[^\S\n]*([A-Z][A-Z0-9]{1,6})[^\S\n]+(0x[0-9a-f]+|\d+)\b[^\S\n]*(.*)$", re.MULTILINE)
+
+# bins 섹션 이름과 항목 라인: "0x20 [  1]: 0x5555555592a0 ◂— 0"
+_BINS_SECTION_RE = re.compile(r"^(tcachebins|fastbins|unsortedbin|smallbins|largebins)\b")
+_BINS_ENTRY_RE = re.compile(r"^\s*(0x[0-9a-f]+|all)(?:\s*\[\s*(\d+)\])?:\s*(.*)$")
+
+# writev 한 번에 넘길 수 있는 최대 버퍼 수
+_IOV_MAX = 1024
+
+# 명령어별 최대 출력 크기
+_OUTPUT_LIMIT = 1 << 20
+
+# 잘렸거나 시간 초과되었거나 GDB가 종료되어 끊긴 응답 끝에 붙는 안내 문구
+_TRUNCATED_NOTE = "... (출력 제한: 1 MiB)"
+_TIMEOUT_NOTE = "... (응답 대기 시간 초과)"
+_EXITED_NOTE = "... (GDB 프로세스 종료됨)"
+
+def _end_marker(tag: str, index: int = 0) -> str:
+    """명령어 응답의 끝을 표시하는 마커 (요청 태그 + 명령어 순번)"""
+    return f"__MCP_END_{tag}_{index}__"
+
+def _send(buffers: list[bytes]) -> None:
+    """여러 버퍼를 writev로 한 번에 GDB stdin에 전송 (부분 쓰기 처리)"""
+    fd = gdb_process.stdin.fileno()
+    views = [memoryview(buffer) for buffer in buffers]
+    index = 0
     
-    if not is_connected:
-        return "Error: GDB 세션이 연결되지 않음. start_debug_session()을 먼저 실행하세요."
+    while index < len(views):
+        written = os.writev(fd, views[index:index + _IOV_MAX])
+        
+        # 모두 전송된 버퍼는 건너뛰고, 일부만 전송된 버퍼는 남은 부분부터 다시 전송
+        while index < len(views) and written >= len(views[index]):
+            written -= len(views[index])
+            index += 1
+        if written:
+            views[index] = views[index][written:]
+
+def _append_capped(segment: bytearray, data: bytes) -> None:
+    """응답 버퍼에 출력 제한(+1 바이트, 잘림 여부 판단용)까지만 덧붙임"""
+    room = _OUTPUT_LIMIT + 1 - len(segment)
+    if room > 0:
+        segment += data[:room]
+
+def _read_replies(markers: list[bytes], timeout: float = 30.0, skip_until: bytes | None = None) -> list[tuple[bytearray, bool, bool]]:
+    """종료 마커들이 나올 때까지 GDB 출력을 청크 단위로 읽어 마커별 응답으로 분리 (응답 내용, 완료 여부, GDB 종료 여부)"""
+    # 반복문에서 쓰는 함수들을 지역 변수로 바인딩 (전역/속성 조회 생략)
+    _select = select.select
+    _monotonic = time.monotonic
+    _read = os.read
+    _fd = gdb_process.stdout.fileno()
     
-    try:
-        # 명령어 전송
-        gdb_process.stdin.write(f"{command}\n")
-        gdb_process.stdin.flush()
+    replies = []
+    segment = bytearray()
+    pending = b""  # 청크 경계에 걸친 마커를 찾기 위해 남겨둔 끝부분
+    exited = False  # EOF로 끝났는지 (시간 초과와 구분)
+    deadline = _monotonic() + timeout
+    
+    while len(replies) < len(markers):
+        # 남은 시간을 그대로 select에 넘겨 최악의 경우에도 timeout을 넘지 않음
+        remaining = deadline - _monotonic()
+        if remaining <= 0:
+            break
         
-        import time
-        import select
+        # select가 출력이 준비될 때까지 대기하므로 별도의 sleep 불필요
+        ready, _, _ = _select([_fd], [], [], remaining)
+        if not ready:
+            break  # 시간 초과
         
-        output_lines = []
-        start_time = time.time()
-        timeout = 5.0
-        buffer = ""
+        try:
+            chunk = _read(_fd, 65536)
+        except BlockingIOError:
+            continue
+        if not chunk:
+            # EOF 또는 프로세스 종료
+            exited = True
+            break
         
-        while time.time() - start_time < timeout:
-            ready, _, _ = select.select([gdb_process.stdout], [], [], 0.1)
-            
-            if ready:
-                # 바이트 단위로 읽기
-                char = gdb_process.stdout.read(1)
-                if char:
-                    buffer += char
-                    
-                    # 라인 완성 시 처리
-                    if char == '\n':
-                        line = buffer.rstrip('\n\r')
-                        if line:  # 빈 줄 무시
-                            output_lines.append(line)
-                        buffer = ""
-                        
-                        # 프롬프트 감지 (라인 끝에서)
-                        if line.endswith("pwndbg>") :
-                            break
-                    
-                    # 프롬프트 감지 (개행 없는 경우)
-                    elif buffer.endswith("pwndbg>") :
-                        if buffer.strip():
-                            output_lines.append(buffer.rstrip())
-                        break
-                        
-                    # 출력 제한
-                    if len(output_lines) > 200:
-                        output_lines.append("... (출력 제한: 200줄)")
-                        break
-                else:
-                    # EOF 또는 프로세스 종료
+        data = pending + chunk
+        pending = b""
+        while data and len(replies) < len(markers):
+            # 시간 초과된 이전 요청의 늦은 출력은 그 요청의 마지막 마커까지 버림
+            if skip_until is not None:
+                index = data.find(skip_until)
+                if index != -1:
+                    data = data[index + len(skip_until):]
+                elif data.find(markers[0]) == -1:
+                    pending = data[-(len(skip_until) - 1):]
                     break
-            else:
-                # 대기 중이지만 출력이 있으면 계속
-                if output_lines and buffer == "":
-                    time.sleep(0.05)  # 짧은 대기 후 종료 판단
-                    ready, _, _ = select.select([gdb_process.stdout], [], [], 0.01)
-                    if not ready:
-                        break
-                else:
-                    time.sleep(0.1)
+                # 찾았거나, 이전 마커 없이 이번 마커가 도착했다면 (이전 마커 유실) 건너뛰기 종료
+                skip_until = None
+                continue
+            
+            # 마커 감지 (보관한 응답이 아니라 새로 읽은 데이터만 검사, 응답은 출력 제한까지만 보관)
+            marker = markers[len(replies)]
+            index = data.find(marker)
+            if index == -1:
+                split = max(0, len(data) - len(marker) + 1)
+                _append_capped(segment, data[:split])
+                pending = data[split:]
+                break
+            
+            _append_capped(segment, data[:index])
+            replies.append((segment, True, False))
+            segment = bytearray()
+            data = data[index + len(marker):]
+    
+    # 시간 초과 또는 EOF: 나머지 응답은 미완료
+    if len(replies) < len(markers):
+        if skip_until is None:
+            _append_capped(segment, pending)
+        replies.append((segment, False, exited))
+        replies.extend((bytearray(), False, exited) for _ in range(len(markers) - len(replies)))
+    
+    return replies
+
+def _exchange(commands: list[str], timeout: float = 30.0) -> list[tuple[bytearray, bool, bool]]:
+    """여러 명령어를 한 번에 전송하고 태그된 마커로 각 응답을 분리 (응답 내용, 완료 여부, GDB 종료 여부)"""
+    global _stale_marker
+    
+    tag = secrets.token_hex(8)
+    markers = [_end_marker(tag, i).encode() for i in range(len(commands))]
+    
+    # 전송부터 마지막 마커 수신까지 다른 호출과 섞이지 않도록 잠금
+    with _gdb_lock:
+        # 명령어마다 태그된 종료 마커를 붙여 한 번에 전송 (파이프라이닝)
+        _send([buffer for cmd, marker in zip(commands, markers) for buffer in (cmd.encode() + b"\n", b"echo " + marker + b"\\n\n")])
         
-        # 버퍼에 남은 내용 처리
-        if buffer.strip():
-            output_lines.append(buffer.strip())
+        # 이전에 시간 초과된 요청의 마커가 있으면 그 이전 출력은 버리고 응답을 마커별로 읽음
+        replies = _read_replies(markers, timeout, _stale_marker)
         
-        # 결과 반환
-        if output_lines:
-            result = "\n".join(output_lines)
-            return result if result.strip() else f"명령어 '{command}' 실행 완료"
-        else:
-            return f"명령어 '{command}' 실행됨 (응답 없음)"
+        # 시간 초과 시 이번 요청의 마지막 마커를 기억해 다음 요청에서 정리 (GDB가 종료되었으면 정리할 출력 없음)
+        _stale_marker = None if replies[-1][1] or replies[-1][2] else markers[-1]
+    
+    return replies
+
+def _format_output(command: str, output: bytearray, completed: bool, exited: bool = False) -> str:
+    """GDB 응답을 도구 결과 문자열로 정리"""
+    # 출력 제한 (바이트 기준)
+    truncated = len(output) > _OUTPUT_LIMIT
+    if truncated:
+        output = output[:_OUTPUT_LIMIT]
+    
+    # 프롬프트와 빈 줄 제거 후 한 번만 디코딩
+    result = _BLANK_LINE_RE.sub(b"", _PROMPT_RE.sub(b"", output)).rstrip().decode("utf-8", "replace")
+    
+    if truncated:
+        result += "\n" + _TRUNCATED_NOTE
+    if exited:
+        result += "\n" + _EXITED_NOTE
+    elif not completed:
+        result += "\n" + _TIMEOUT_NOTE
+    
+    # 결과 반환
+    return result.lstrip("\n") or f"명령어 '{command}' 실행됨 (응답 없음)"
+
+def _clear_result_cache() -> None:
+    """명령어 결과 캐시 초기화"""
+    global _result_cache_generation
+    
+    _result_cache.clear()
+    _parsed_cache.clear()
+    _result_cache_generation += 1
+
+def _batch_size(commands: list[str]) -> int:
+    """GDB stdin으로 보낼 입력 크기 추정 (명령어 + 종료 마커 echo 라인, 마커 라인은 넉넉히 48바이트로 계산)"""
+    return sum(len(command.encode()) + 1 + 48 for command in commands)
+
+async def _writer_loop(queue: asyncio.Queue) -> None:
+    """전송 큐의 요청을 모아서 한 번의 GDB 왕복으로 처리하는 작업"""
+    carry = None
+    while True:
+        batch = [carry if carry is not None else await queue.get()]
+        carry = None
+        size = _batch_size(batch[0][0])
+        
+        # 짧은 시간 안에 연달아 들어온 요청을 입력 크기 제한까지 모아서 한 번에 전송
+        while size < _BATCH_BYTES:
+            try:
+                request = await asyncio.wait_for(queue.get(), _BATCH_WINDOW)
+            except asyncio.TimeoutError:
+                break
             
-    except Exception as e:
-        return f"명령어 실행 실패: {e}"
+            request_size = _batch_size(request[0])
+            if size + request_size > _BATCH_BYTES:
+                # 제한을 넘기는 요청은 다음 묶음의 첫 요청으로 넘김
+                carry = request
+                break
+            batch.append(request)
+            size += request_size
+        
+        commands = [command for batch_commands, _ in batch for command in batch_commands]
+        try:
+            # GDB 응답 대기는 별도 스레드에서 처리하여 이벤트 루프를 막지 않음
+            replies = await asyncio.to_thread(_exchange, commands)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        
+        # 요청별로 응답 나누어 전달
+        start = 0
+        for batch_commands, future in batch:
+            if not future.done():
+                future.set_result(replies[start:start + len(batch_commands)])
+            start += len(batch_commands)
+
+async def _submit(commands: list[str]) -> list[tuple[bytearray, bool, bool]]:
+    """명령어를 전송 큐에 넣고 응답 대기"""
+    global _command_queue, _writer_task
+    
+    # 전송 작업은 현재 이벤트 루프에서 처음 제출될 때 시작
+    if _writer_task is None or _writer_task.done():
+        _command_queue = asyncio.Queue()
+        _writer_task = asyncio.create_task(_writer_loop(_command_queue))
+    
+    future = asyncio.get_running_loop().create_future()
+    await _command_queue.put((commands, future))
+    return await future
+
+async def _execute_safe_commands(commands: list[str]) -> list[str]:
+    """여러 명령어를 한 번의 GDB 왕복으로 안전하게 실행"""
+    global gdb_process, is_connected
+    
+    if not is_connected:
+        return ["Error: GDB 세션이 연결되지 않음. start_debug_session()을 먼저 실행하세요."] * len(commands)
+    
+    results = {}
+    for command in commands:
+        # 개행이 섞이면 명령어 경계가 깨지므로 차단 (해당 명령어만 실패, 나머지는 실행)
+        if "\n" in command or "\r" in command:
+            results[command] = "Error: 명령어에 개행 문자를 포함할 수 없습니다"
+        # 입력 파이프가 가득 차지 않도록 모든 명령어에 길이 제한 적용
+        elif len(command) > _COMMAND_MAX:
+            results[command] = f"Error: 명령어가 너무 깁니다 (최대 {_COMMAND_MAX}자)"
+    
+    # 상태를 바꾸는 명령어가 섞여 있으면 캐시를 비우고 이번 요청은 캐시를 사용하지 않음
+    use_cache = not any(_base_command(command) in _MUTATING_COMMANDS for command in commands if command not in results)
+    if not use_cache:
+        _clear_result_cache()
+    generation = _result_cache_generation
+    
+    if use_cache:
+        results.update({command: _result_cache[command] for command in commands if command not in results and command in _result_cache})
+    
+    pending = [command for command in commands if command not in results]
+    if pending:
+        try:
+            replies = await _submit(pending)
+        except Exception as e:
+            return [results.get(command, f"명령어 실행 실패: {e}") for command in commands]
+        
+        for command, (output, completed, exited) in zip(pending, replies):
+            results[command] = _format_output(command, output, completed, exited)
+            if use_cache and completed and command in _IDEMPOTENT_COMMANDS and generation == _result_cache_generation:
+                _result_cache[command] = results[command]
+    
+    return [results[command] for command in commands]
+
+async def _execute_safe_command(command: str) -> str:
+    """안전한 명령어 실행"""
+    return (await _execute_safe_commands([command]))[0]
+
+def _parse_vmmap(output: str) -> dict | None:
+    """vmmap 출력을 메모리 영역 목록으로 파싱"""
+    regions = [
+        {"start": start, "end": end, "perm": perm, "size": size, "offset": offset, "file": file}
+        for start, end, perm, size, offset, file in _VMMAP_RE.findall(output)
+    ]
+    return {"regions": regions} if regions else None
+
+def _parse_checksec(output: str) -> dict | None:
+    """checksec 출력을 항목별 보안 기능으로 파싱"""
+    fields = dict(_CHECKSEC_RE.findall(output))
+    return fields if "RELRO" in fields or "Arch" in fields else None
+
+def _parse_regs(output: str) -> dict | None:
+    """registers 출력을 레지스터별 값으로 파싱"""
+    registers = {
+        name: {"value": value, "detail": detail, "changed": bool(changed)}
+        for changed, name, value, detail in _REGISTER_RE.findall(output)
+    }
+    return {"registers": registers} if registers else None
+
+def _parse_bins(output: str) -> dict | None:
+    """bins 출력을 bin 종류별 항목 목록으로 파싱"""
+    bins = {}
+    entries = None
+    
+    for line in output.splitlines():
+        section = _BINS_SECTION_RE.match(line)
+        if section:
+            entries = bins.setdefault(section.group(1), [])
+            continue
+        
+        entry = _BINS_ENTRY_RE.match(line)
+        if entry and entries is not None:
+            size, count, chain = entry.groups()
+            entries.append({"size": size, "count": int(count) if count else None, "chain": chain})
+    
+    return bins if bins else None
+
+# 구조화된 결과를 반환할 명령어별 파서
+_parsers = {
+    "vmmap": _parse_vmmap,
+    "checksec": _parse_checksec,
+    "registers": _parse_regs,
+    "bins": _parse_bins,
+}
+
+async def _execute_parsed(command: str) -> dict | str:
+    """명령어 실행 후 결과를 구조화 (파싱할 수 없으면 원본 텍스트 반환)"""
+    if command in _parsed_cache:
+        return _parsed_cache[command]
+    
+    output = await _execute_safe_command(command)
+    
+    # 잘렸거나 시간 초과되었거나 GDB 종료로 끊긴 출력은 일부만 파싱되어 완전한 결과처럼 보이므로 원본 그대로 반환
+    if output.endswith((_TRUNCATED_NOTE, _TIMEOUT_NOTE, _EXITED_NOTE)):
+        return output
+    
+    parsed = _parsers[command](_ANSI_RE.sub("", output))
+    if parsed is None:
+        return output
+    
+    # 원본 결과가 캐시된 경우에만 (완료된 응답, 세션 상태 변경 없음) 파싱 결과도 캐시
+    if command in _result_cache:
+        _parsed_cache[command] = parsed
+    return parsed
+
+def _spawn_gdb(gdb_cmd: list[str]) -> None:
+    """GDB 프로세스 실행 후 초기화 메시지를 모두 읽어서 버림"""
+    global gdb_process, _stale_marker
+    
+    gdb_process = subprocess.Popen(
+        gdb_cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0
+    )
+    
+    # stdout을 non-blocking으로 설정 (청크 단위 읽기)
+    fd = gdb_process.stdout.fileno()
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    
+    # 초기화 메시지를 종료 마커까지 모두 읽어서 버림
+    marker = _end_marker(secrets.token_hex(8)).encode()
+    _send([b"echo " + marker + b"\\n\n"])
+    if _read_replies([marker])[0][1]:
+        _stale_marker = None
+        return
+    
+    # 마커를 못 받았으면 GDB가 종료되었는지 잠시 기다려 확인 (종료되었으면 회수하고 이전 마커는 남기지 않음)
+    try:
+        gdb_process.wait(timeout=1.0)
+        _stale_marker = None
+    except subprocess.TimeoutExpired:
+        # 초기화가 느린 경우: 늦게 도착하는 초기화 메시지는 다음 요청에서 정리
+        _stale_marker = marker
+
+def _terminate_gdb(proc: subprocess.Popen) -> None:
+    """GDB 프로세스 종료 (EOF로 정상 종료 유도 → SIGTERM → SIGKILL 순서로 단계적 종료)"""
+    # 진행 중인 명령어가 없으면 파이프를 닫아 EOF로 정상 종료 유도
+    # (명령어가 진행 중이면 그 스레드가 쓰는 파이프를 닫지 않고 바로 시그널로 종료)
+    if _gdb_lock.acquire(blocking=False):
+        try:
+            proc.stdin.close()
+        finally:
+            _gdb_lock.release()
+        
+        try:
+            proc.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            pass
+    
+    if proc.poll() is None:
+        # ptrace 중인 inferior 때문에 멈춰 있으면 SIGTERM, 그래도 안 되면 SIGKILL
+        proc.terminate()
+        try:
+            proc.wait(timeout=2.0)
+        except subprocess.TimeoutExpired:
+            # SIGKILL은 무시할 수 없으므로 종료될 때까지 대기
+            proc.kill()
+            proc.wait()
+    
+    # 프로세스가 종료되어 진행 중이던 명령어도 EOF로 끝나므로 잠금을 얻은 뒤 파이프 정리
+    with _gdb_lock:
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+def _find_gdb() -> str | None:
+    """PATH에서 GDB 실행 파일 찾기 (서버 실행 중 PATH는 거의 바뀌지 않으므로 캐시)"""
+    global gdb_path
+    
+    if gdb_path is None:
+        gdb_path = shutil.which("gdb")
+    return gdb_path
+
+def _pwndbg_installed() -> bool:
+    """pwndbg 설치 여부 확인 (설치된 것이 확인되면 캐시)"""
+    global pwndbg_found
+    
+    if not pwndbg_found:
+        pwndbg_paths = (
+            _HOME / ".gdbinit",
+            Path("/usr/share/pwndbg"),
+            _HOME / "pwndbg"
+        )
+        pwndbg_found = any(path.exists() for path in pwndbg_paths)
+    return pwndbg_found
 
 @mcp.tool()
-def check_pwndbg_connection() -> str:
+async def check_pwndbg_connection() -> str:
     """pwndbg 연결 상태 확인"""
     try:
-        result = subprocess.run(["which", "gdb"], capture_output=True, text=True)
-        if result.returncode != 0:
+        if _find_gdb() is None:
             return "Error: GDB가 설치되지 않음"
         
-        pwndbg_paths = [
-            Path.home() / ".gdbinit",
-            Path("/usr/share/pwndbg"),
-            Path.home() / "pwndbg"
-        ]
-        
-        pwndbg_found = any(path.exists() for path in pwndbg_paths)
-        if not pwndbg_found:
+        if not _pwndbg_installed():
             return "Warning: pwndbg가 설치되지 않았을 수 있음"
         
         if is_connected:
@@ -157,267 +604,258 @@ def check_pwndbg_connection() -> str:
         return f"Error: {e}"
 
 @mcp.tool()
-def start_debug_session(binary_path: str = "") -> str:
+async def start_debug_session(binary_path: str = "") -> str:
     """GDB 디버깅 세션 시작 (바이너리 경로 선택사항)"""
     global gdb_process, is_connected
     
-    if is_connected:
-        return "이미 GDB 세션이 활성화되어 있습니다. stop_debug_session()을 먼저 실행하세요."
-    
-    if binary_path and not os.path.exists(binary_path):
-        return f"Error: 바이너리 파일을 찾을 수 없습니다: {binary_path}"
-    
-    try:
-        gdb_cmd = ["gdb", "-q"]
-        
-        if binary_path:
-            gdb_cmd.append(binary_path)
-            success_msg = f"✓ GDB 세션 시작됨 (바이너리: {binary_path})"
-        else:
-            success_msg = "✓ GDB 세션 시작됨 (바이너리 없음)"
-        
-        gdb_cmd.extend([
-            "-ex", "set confirm off",
-            "-ex", "set pagination off",
-        ])
-        
-        gdb_process = subprocess.Popen(
-            gdb_cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
-        )
+    # 동시에 시작/종료되지 않도록 세션 잠금 (확인과 GDB 실행 사이에 다른 호출이 끼어들지 않음)
+    async with _session_lock:
+        if is_connected:
+            return "이미 GDB 세션이 활성화되어 있습니다. stop_debug_session()을 먼저 실행하세요."
         
-        # 초기화 메시지 읽기 및 프롬프트 대기
-        import time
-        import select
+        if binary_path and not os.path.exists(binary_path):
+            return f"Error: 바이너리 파일을 찾을 수 없습니다: {binary_path}"
         
-        start_time = time.time()
-        timeout = 5.0
-        buffer = ""
+        gdb = _find_gdb()
+        if gdb is None:
+            return "Error: GDB가 설치되지 않음"
         
-        while time.time() - start_time < timeout:
-            ready, _, _ = select.select([gdb_process.stdout], [], [], 0.1)
+        try:
+            gdb_cmd = [gdb, "-q"]
             
-            if ready:
-                char = gdb_process.stdout.read(1)
-                if char:
-                    buffer += char
-                    # 프롬프트 감지 (완전한 프롬프트 대기)
-                    if buffer.endswith("pwndbg>") :
-                        break
-                else:
-                    break
+            if binary_path:
+                gdb_cmd.append(binary_path)
+                success_msg = f"✓ GDB 세션 시작됨 (바이너리: {binary_path})"
             else:
-                time.sleep(0.1)
-        
-        # 프로세스 상태 확인
-        if gdb_process.poll() is not None:
+                success_msg = "✓ GDB 세션 시작됨 (바이너리 없음)"
+            
+            gdb_cmd.extend([
+                "-ex", "set confirm off",
+                "-ex", "set pagination off",
+            ])
+            
+            # 이전 세션의 결과 캐시 초기화
+            _clear_result_cache()
+            
+            # 초기화 메시지 대기는 별도 스레드에서 처리
+            await asyncio.to_thread(_spawn_gdb, gdb_cmd)
+            
+            # 프로세스 상태 확인 (종료된 프로세스의 파이프 정리)
+            if gdb_process.poll() is not None:
+                await asyncio.to_thread(_terminate_gdb, gdb_process)
+                gdb_process = None
+                is_connected = False
+                return "Error: GDB 프로세스가 예기치 않게 종료되었습니다."
+            
+            is_connected = True
+            return success_msg
+            
+        except Exception as e:
+            # Popen 이후 초기화 중 실패한 경우 이미 실행된 프로세스를 종료하고 회수
+            if gdb_process:
+                await asyncio.to_thread(_terminate_gdb, gdb_process)
             gdb_process = None
             is_connected = False
-            return "Error: GDB 프로세스가 예기치 않게 종료되었습니다."
-        
-        is_connected = True
-        return success_msg
-        
-    except Exception as e:
-        gdb_process = None
-        is_connected = False
-        return f"GDB 세션 시작 실패: {e}"
+            return f"GDB 세션 시작 실패: {e}"
 
 @mcp.tool()
-def stop_debug_session() -> str:
+async def stop_debug_session() -> str:
     """GDB 디버깅 세션 종료"""
     global gdb_process, is_connected
     
-    if not is_connected:
-        return "GDB 세션이 활성화되어 있지 않습니다."
-    
-    try:
-        if gdb_process:
-            gdb_process.terminate()
-        gdb_process = None
-        is_connected = False
-        return "✓ GDB 세션이 종료되었습니다."
-    except Exception as e:
-        return f"GDB 세션 종료 실패: {e}"
+    async with _session_lock:
+        if not is_connected:
+            return "GDB 세션이 활성화되어 있지 않습니다."
+        
+        try:
+            if gdb_process:
+                await asyncio.to_thread(_terminate_gdb, gdb_process)
+            return "✓ GDB 세션이 종료되었습니다."
+        except Exception as e:
+            return f"GDB 세션 종료 실패: {e}"
+        finally:
+            # 종료 중 오류가 나도 파이프는 이미 닫혔을 수 있으므로 세션 상태는 항상 초기화
+            gdb_process = None
+            is_connected = False
+            _clear_result_cache()
 
 # ============================================================================
 # 힙 분석 툴들
 # ============================================================================
 
 @mcp.tool()
-def heap() -> str:
+async def heap() -> str:
     """힙 상태 전체 요약"""
-    return _execute_safe_command("heap")
+    return await _execute_safe_command("heap")
 
 @mcp.tool()
-def bins() -> str:
+async def bins() -> dict | str:
     """모든 bin 상태 확인"""
-    return _execute_safe_command("bins")
+    return await _execute_parsed("bins")
 
 @mcp.tool()
-def vis() -> str:
+async def vis() -> str:
     """힙 청크 시각화"""
-    return _execute_safe_command("vis_heap_chunks")
+    return await _execute_safe_command("vis_heap_chunks")
 
 @mcp.tool()
-def malloc_chunk(address: str) -> str:
+async def malloc_chunk(address: str) -> str:
     """특정 청크 분석"""
     if not address:
         return "Error: 주소를 입력해주세요"
-    return _execute_safe_command(f"chunk {address}")
+    return await _execute_safe_command(f"chunk {address}")
 
 # ============================================================================
 # 바이너리 보안 툴들
 # ============================================================================
 
 @mcp.tool()
-def checksec() -> str:
+async def checksec() -> dict | str:
     """바이너리 보안 기능 확인"""
-    return _execute_safe_command("checksec")
+    return await _execute_parsed("checksec")
 
 @mcp.tool()
-def vmmap() -> str:
+async def vmmap() -> dict | str:
     """메모리 매핑 정보"""
-    return _execute_safe_command("vmmap")
+    return await _execute_parsed("vmmap")
 
 @mcp.tool()
-def canary() -> str:
+async def canary() -> str:
     """스택 카나리 확인"""
-    return _execute_safe_command("canary")
+    return await _execute_safe_command("canary")
 
 # ============================================================================
 # 레지스터/메모리 툴들
 # ============================================================================
 
 @mcp.tool()
-def regs() -> str:
+async def regs() -> dict | str:
     """레지스터 상태 확인"""
-    return _execute_safe_command("registers")
+    return await _execute_parsed("registers")
 
 @mcp.tool()
-def stack() -> str:
+async def stack() -> str:
     """스택 내용 확인"""
-    return _execute_safe_command("stack")
+    return await _execute_safe_command("stack")
 
 @mcp.tool()
-def telescope(address: str = "") -> str:
+async def telescope(address: str = "") -> str:
     """메모리 덤프 (포인터 추적)"""
     if address:
-        return _execute_safe_command(f"telescope {address}")
-    return _execute_safe_command("telescope")
+        return await _execute_safe_command(f"telescope {address}")
+    return await _execute_safe_command("telescope")
 
 @mcp.tool()
-def context() -> str:
+async def context() -> str:
     """전체 컨텍스트 확인"""
-    return _execute_safe_command("context")
+    return await _execute_safe_command("context")
+
+@mcp.tool()
+async def context_bundle(commands: list[str]) -> dict[str, str]:
+    """여러 명령어를 한 번의 GDB 왕복으로 실행 (예: ["registers", "stack", "vmmap"])"""
+    if len(commands) > _BUNDLE_MAX:
+        return {command: f"Error: 한 번에 최대 {_BUNDLE_MAX}개의 명령어만 실행할 수 있습니다" for command in commands}
+    
+    # 명령어별 안전성 검증 (중복 명령어는 한 번만 실행)
+    errors = {command: _validate_command(command) for command in commands}
+    valid_commands = [command for command, error in errors.items() if not error]
+    
+    outputs = {}
+    if valid_commands:
+        outputs = dict(zip(valid_commands, await _execute_safe_commands(valid_commands)))
+    
+    return {command: error or outputs[command] for command, error in errors.items()}
 
 # ============================================================================
 # 검색/분석 툴들
 # ============================================================================
 
 @mcp.tool()
-def search(pattern: str) -> str:
+async def search(pattern: str) -> str:
     """메모리 값 검색"""
     if not pattern:
         return "Error: 검색할 패턴을 입력해주세요"
-    return _execute_safe_command(f"search {pattern}")
+    return await _execute_safe_command(f"search {pattern}")
 
 @mcp.tool()
-def find(pattern: str) -> str:
+async def find(pattern: str) -> str:
     """패턴 검색"""
     if not pattern:
         return "Error: 검색할 패턴을 입력해주세요"
-    return _execute_safe_command(f"find {pattern}")
+    return await _execute_safe_command(f"find {pattern}")
 
 @mcp.tool()
-def got() -> str:
+async def got() -> str:
     """GOT 테이블 확인"""
-    return _execute_safe_command("got")
+    return await _execute_safe_command("got")
 
 @mcp.tool()
-def plt() -> str:
+async def plt() -> str:
     """PLT 테이블 확인"""
-    return _execute_safe_command("plt")
+    return await _execute_safe_command("plt")
 
 @mcp.tool()
-def rop() -> str:
+async def rop() -> str:
     """ROP 가젯 검색"""
-    return _execute_safe_command("rop")
+    return await _execute_safe_command("rop")
 
 
 # ============================================================================
 # 예외 처리 툴
 # ============================================================================
 
-@mcp.tool()
-def execute_custom_command(command: str) -> str:
-    """AI가 기본 툴로 해결할 수 없는 경우를 위한 사용자 정의 명령어 실행 (안전성 검증됨)"""
-    if not command:
-        return "Error: 명령어를 입력해주세요"
+def _base_command(command: str) -> str:
+    """명령어의 첫 토큰 (공백 문자 기준, 첫 토큰 이후는 나누지 않음)"""
+    parts = command.split(None, 1)
+    return parts[0] if parts else ""
+
+def _validate_command(command: str) -> str | None:
+    """사용자 정의 명령어 안전성 검증 (위험한 경우 오류 메시지 반환)"""
+    # 개행이 섞이면 명령어 경계가 깨지므로 차단 (실행 전에 거부하여 실행된 것으로 보고되지 않음)
+    if "\n" in command or "\r" in command:
+        return "Error: 명령어에 개행 문자를 포함할 수 없습니다"
     
-    # 명령어 안전성 검증
-    command_parts = command.split()
-    if not command_parts:
+    base_command = _base_command(command)
+    if not base_command:
         return "Error: 올바른 명령어를 입력해주세요"
     
-    base_command = command_parts[0]
-    
     # 화이트리스트 검증
     if base_command not in ALLOWED_COMMANDS:
-        return f"Error: 허용되지 않은 명령어입니다. 사용 가능한 명령어: {', '.join(sorted(ALLOWED_COMMANDS))}"
+        return f"Error: 허용되지 않은 명령어입니다. 사용 가능한 명령어: {_ALLOWED_SORTED_STR}"
     
     # 위험한 명령어 패턴 검사
-    dangerous_patterns = [
-        'rm', 'del', 'format', 'mkfs', 'dd if=', 'dd of=',
-        'sudo', 'su', 'chmod +x', 'wget', 'curl', 'nc ', 'netcat',
-        'python -c', 'perl -e', 'ruby -e', 'bash -c', 'sh -c',
-        '$(', '`', '&&', '||', ';', '|', '>', '>>', '<'
-    ]
-    
-    for pattern in dangerous_patterns:
-        if pattern in command.lower():
-            return f"Error: 보안상 위험한 패턴이 감지되었습니다: {pattern}"
+    match = _DANGEROUS_RE.search(command)
+    if match:
+        return f"Error: 보안상 위험한 패턴이 감지되었습니다: {match.group(0).lower()}"
     
     # 명령어 길이 제한 (너무 긴 명령어 방지)
-    if len(command) > 200:
-        return "Error: 명령어가 너무 깁니다 (최대 200자)"
+    if len(command) > _COMMAND_MAX:
+        return f"Error: 명령어가 너무 깁니다 (최대 {_COMMAND_MAX}자)"
+    
+    return None
+
+@mcp.tool()
+async def execute_custom_command(command: str) -> str:
+    """AI가 기본 툴로 해결할 수 없는 경우를 위한 사용자 정의 명령어 실행 (안전성 검증됨)"""
+    if not command:
+        return "Error: 명령어를 입력해주세요"
+    
+    # 명령어 안전성 검증
+    error = _validate_command(command)
+    if error:
+        return error
     
     # 안전성 검증 통과 시 실행
     try:
-        result = _execute_safe_command(command)
+        result = await _execute_safe_command(command)
         return f"✓ 사용자 정의 명령어 실행됨: {command}\n\n{result}"
     except Exception as e:
         return f"사용자 정의 명령어 실행 실패: {e}"
 
 @mcp.tool()
-def list_available_commands() -> str:
+async def list_available_commands() -> str:
     """사용 가능한 모든 pwndbg 명령어 목록 조회"""
-    commands_by_category = {
-        "힙 분석": ["heap", "bins", "vis_heap_chunks", "chunk", "fastbins", "smallbins", "largebin", "unsortedbin", "tcache", "arena"],
-        "보안 분석": ["checksec", "vmmap", "canary", "piebase", "procinfo"],
-        "레지스터/메모리": ["registers", "regs", "stack", "telescope", "context", "hexdump"],
-        "검색/분석": ["search", "find", "got", "plt", "rop", "ropper", "strings"],
-        "디스어셈블리": ["disasm", "disassemble", "nearpc", "pdisass"],
-        "실행 제어": ["break", "continue", "step", "next", "finish", "run"],
-        "기본 GDB": ["info", "print", "x", "examine", "backtrace", "bt", "frame", "set", "show", "list", "file", "load"]
-    }
-    
-    result = "=== 사용 가능한 pwndbg 명령어 목록 ===\n\n"
-    
-    for category, commands in commands_by_category.items():
-        result += f"📋 {category}:\n"
-        for cmd in commands:
-            result += f"  • {cmd}\n"
-        result += "\n"
-    
-    result += "⚠️ 참고: execute_custom_command() 툴을 사용하여 위 명령어들을 직접 실행할 수 있습니다.\n"
-    result += "하지만 각 기능별로 전용 툴을 사용하는 것을 권장합니다."
-    
-    return result
+    return _AVAILABLE_COMMANDS_STR
 
 def main():
     parser = argparse.ArgumentParser(description="pwndbg MCP Server")
@@ -432,7 +870,7 @@ def main():
     finally:
         global gdb_process, is_connected
         if gdb_process:
-            gdb_process.terminate()
+            _terminate_gdb(gdb_process)
         gdb_process = None
         is_connected = False
 